@@ -1,9 +1,29 @@
 import os
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from googleapiclient.discovery import build
+import httplib2
 from googleapiclient.errors import HttpError
 import pandas as pd
-from typing import List, Dict
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.utils import get_column_letter
+from diskcache import Cache
+try:
+    from pybloom_live import ScalableBloomFilter
+except ImportError:
+    ScalableBloomFilter = None
+from tenacity import (
+    before_sleep_log,
+    retry,
+    retry_if_exception,
+    stop_after_attempt,
+    wait_exponential_jitter,
+)
+from typing import List, Dict, Iterable, Iterator
+from itertools import islice
+import json
+from concurrent.futures import ThreadPoolExecutor, wait
+import threading
 import time
 import logging
 import sys
@@ -20,243 +40,567 @@ API_KEY = 'YOUTUBE API KEY'
 YOUTUBE_API_SERVICE_NAME = 'youtube'
 YOUTUBE_API_VERSION = 'v3'
 MIN_CHANNELS_REQUIRED = 50  # Target number of channels
+MIN_SUBSCRIBERS = 100  # Ignore channels with fewer subscribers than this
 EXCEL_FILE = os.path.join(os.getcwd(), 'new_youtube_channels.xlsx')
+CSV_FILE = os.path.join(os.getcwd(), 'new_youtube_channels.csv')
+OUTPUT_FORMAT = 'xlsx'  # 'xlsx' for a formatted workbook, 'csv' for the fastest plain output
+OUTPUT_FILE = CSV_FILE if OUTPUT_FORMAT == 'csv' else EXCEL_FILE
+PROCESSED_CHANNELS_FILE = os.path.join(os.getcwd(), 'processed_channels.json')
+PROCESSED_CHANNELS_BLOOM_FILE = os.path.join(os.getcwd(), 'processed_channels.bloom')
+USE_BLOOM_FILTER = False  # Track processed channels in a Bloom filter for very large crawls (needs pybloom_live)
+BLOOM_INITIAL_CAPACITY = 10_000
+BLOOM_ERROR_RATE = 1e-4  # Chance of wrongly skipping an unseen channel
+CACHE_DIR = os.path.join(os.getcwd(), '.yt_cache')
+CACHE_TTL_SECONDS = 24 * 60 * 60  # Channel metadata changes slowly, refresh daily
+# ETag cache for conditional API requests, or None to disable. Cached responses record the
+# request URL, which includes the API key, so entries are pruned after HTTP_CACHE_MAX_AGE_SECONDS
+HTTP_CACHE_DIR = os.path.join(os.getcwd(), '.http_cache')
+HTTP_CACHE_MAX_AGE_SECONDS = 24 * 60 * 60  # Search windows move on at UTC midnight, so older entries never hit
+HTTP_TIMEOUT_SECONDS = 60
 DAYS_TO_SEARCH = 90  # Search last 90 days for more recent channels
+SEARCH_BUCKET_DAYS = 30  # Width of each publishedAfter/publishedBefore search window
+SEARCH_ORDER = 'viewCount'  # Popular recent uploads surface more new channels than 'date'
+MIN_HITS_PER_PAGE = 1  # Skip a search window once it yields fewer new channels per page
+MIN_PAGES_PER_BUCKET = 2  # Pages searched in a window before its hit rate is judged
+RECENT_CHANNEL_CUTOFF = datetime.now() - timedelta(days=180)  # Channels created after this count as new
 MAX_RESULTS_PER_PAGE = 50  # Maximum results per API call
+MAX_IDS_PER_REQUEST = 50  # Maximum channel IDs per channels.list call
+MAX_WORKERS = 8  # Concurrent channels.list requests in flight
+SEARCH_QUOTA_COST = 100  # Quota units charged per search.list call
+CHANNELS_QUOTA_COST = 1  # Quota units charged per channels.list call
+DAILY_QUOTA = 10_000  # YouTube Data API quota units per project per day (default allocation)
+# Each run starts the limiter with a full day's quota and refills it at the rate the daily
+# quota resets. This caps what a single run spends; the limiter does not know what earlier
+# runs on the same day used, so back-to-back runs can still hit quotaExceeded
+QUOTA_UNITS_PER_SECOND = DAILY_QUOTA / (24 * 60 * 60)
+QUOTA_BURST = DAILY_QUOTA
+LONG_WAIT_SECONDS = 5  # Rate-limit waits longer than this are logged as warnings
+MAX_API_ATTEMPTS = 6  # Attempts per API call before giving up on transient errors
+RETRYABLE_403_REASONS = {'rateLimitExceeded', 'userRateLimitExceeded'}
+
+# httplib2 connections are not thread-safe, so each thread keeps its own
+# keep-alive connection pool for the lifetime of the script
+_thread_local = threading.local()
 
 def verify_excel_file():
-    """Verify that the Excel file exists and is accessible."""
+    """Verify that the output file exists and is accessible."""
     try:
-        if os.path.exists(EXCEL_FILE):
-            logger.info(f"Excel file exists at: {EXCEL_FILE}")
+        if os.path.exists(OUTPUT_FILE):
+            logger.info(f"Output file exists at: {OUTPUT_FILE}")
             return True
         else:
-            logger.info(f"Excel file will be created at: {EXCEL_FILE}")
+            logger.info(f"Output file will be created at: {OUTPUT_FILE}")
             return False
     except Exception as e:
-        logger.error(f"Error checking Excel file: {e}")
+        logger.error(f"Error checking output file: {e}")
         return False
 
+class TokenBucket:
+    """Thread-safe token bucket used to pace API calls by quota cost."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, cost: float = 1):
+        """Block until `cost` tokens are available, then consume them."""
+        if cost > self.capacity:
+            raise ValueError(f"Cost {cost} exceeds the bucket capacity of {self.capacity}")
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= cost:
+                    self.tokens -= cost
+                    return
+                wait_time = (cost - self.tokens) / self.rate
+            if wait_time > LONG_WAIT_SECONDS:
+                logger.warning("Quota budget used up, waiting %.0fs before the next API call", wait_time)
+            else:
+                logger.debug("Rate limit reached, waiting %.2fs", wait_time)
+            time.sleep(wait_time)
+
+quota_limiter = TokenBucket(QUOTA_UNITS_PER_SECOND, QUOTA_BURST)
+channel_cache = Cache(CACHE_DIR)
+
 def get_youtube_service():
     """Create and return a YouTube API service object."""
-    return build(YOUTUBE_API_SERVICE_NAME, YOUTUBE_API_VERSION, developerKey=API_KEY)
+    return build(
+        YOUTUBE_API_SERVICE_NAME,
+        YOUTUBE_API_VERSION,
+        developerKey=API_KEY,
+        http=get_thread_http(),
+        static_discovery=True
+    )
 
-def search_recent_videos(youtube, max_results: int = MAX_RESULTS_PER_PAGE, page_token: str = None) -> tuple[List[Dict], str]:
+def get_thread_http():
+    """
+    Return the HTTP object owned by the calling thread.
+    Connections are kept alive between requests, and responses are cached on disk
+    so repeated requests are revalidated with If-None-Match.
     """
-    Search for recent videos to find new channels.
+    if not hasattr(_thread_local, 'http'):
+        http = httplib2.Http(cache=HTTP_CACHE_DIR, timeout=HTTP_TIMEOUT_SECONDS)
+        # Match googleapiclient's default transport, which does not follow 308 redirects
+        http.redirect_codes = http.redirect_codes - {308}
+        _thread_local.http = http
+    return _thread_local.http
+
+def prune_http_cache():
+    """Delete cached HTTP responses older than HTTP_CACHE_MAX_AGE_SECONDS."""
+    if not HTTP_CACHE_DIR or not os.path.isdir(HTTP_CACHE_DIR):
+        return
+
+    cutoff = time.time() - HTTP_CACHE_MAX_AGE_SECONDS
+    removed = 0
+    for entry in os.scandir(HTTP_CACHE_DIR):
+        try:
+            if entry.is_file() and entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+                removed += 1
+        except OSError as e:
+            logger.error(f"Error removing cached HTTP response {entry.path}: {e}")
+    if removed:
+        logger.info(f"Removed {removed} expired HTTP cache entries")
+
+def is_transient_error(exc: BaseException) -> bool:
+    """Check if an API error is worth retrying (5xx, 429 or a 403 rate limit)."""
+    if not isinstance(exc, HttpError):
+        return False
+    status = exc.resp.status
+    if status == 429 or status >= 500:
+        return True
+    if status == 403 and isinstance(exc.error_details, list):
+        reasons = {detail.get('reason') for detail in exc.error_details if isinstance(detail, dict)}
+        return bool(reasons & RETRYABLE_403_REASONS)
+    return False
+
+@retry(
+    retry=retry_if_exception(is_transient_error),
+    wait=wait_exponential_jitter(initial=1, max=60),
+    stop=stop_after_attempt(MAX_API_ATTEMPTS),
+    before_sleep=before_sleep_log(logger, logging.WARNING),
+    reraise=True
+)
+def execute_request(request, quota_cost: int, http=None) -> Dict:
+    """Execute an API request, retrying transient errors with exponential backoff."""
+    quota_limiter.acquire(quota_cost)
+    return request.execute(http=http)
+
+def build_search_buckets() -> List[Dict]:
+    """
+    Split the search window into SEARCH_BUCKET_DAYS-wide buckets, newest first.
+    Each bucket keeps its own pagination state and hit statistics.
+    """
+    # Align the windows to UTC midnight so reruns on the same day send identical
+    # search URLs, letting the HTTP cache revalidate them with If-None-Match
+    end = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+    buckets = []
+    for start_day in range(0, DAYS_TO_SEARCH, SEARCH_BUCKET_DAYS):
+        end_day = min(start_day + SEARCH_BUCKET_DAYS, DAYS_TO_SEARCH)
+        buckets.append({
+            'published_after': (end - timedelta(days=end_day)).strftime('%Y-%m-%dT%H:%M:%SZ'),
+            'published_before': (end - timedelta(days=start_day)).strftime('%Y-%m-%dT%H:%M:%SZ'),
+            'next_page_token': None,
+            'pages': 0,
+            'hits': 0,
+            'exhausted': False
+        })
+    return buckets
+
+def search_recent_videos(youtube, published_after: str, published_before: str, max_results: int = MAX_RESULTS_PER_PAGE, page_token: str = None) -> tuple[List[Dict], str]:
+    """
+    Search for videos published in the given time window to find new channels.
     Returns a tuple of (list of video items, next page token).
     """
     try:
-        # Calculate the date X days ago
-        days_ago = (datetime.now() - timedelta(days=DAYS_TO_SEARCH)).strftime('%Y-%m-%dT%H:%M:%SZ')
-        logger.info(f"Searching for videos published after: {days_ago}")
+        logger.info("Searching for videos published between %s and %s", published_after, published_before)
         
-        # Search for videos published in the last X days
-        search_response = youtube.search().list(
+        # Search for videos published in the time window
+        search_response = execute_request(youtube.search().list(
             q='',  # Empty query to get trending/viral content
             part='snippet',
             maxResults=max_results,
             type='video',
             regionCode='US',
-            publishedAfter=days_ago,
-            order='date',
-            pageToken=page_token
-        ).execute()
+            publishedAfter=published_after,
+            publishedBefore=published_before,
+            order=SEARCH_ORDER,
+            pageToken=page_token,
+            fields='items(snippet/channelId),nextPageToken'
+        ), SEARCH_QUOTA_COST)
 
         items = search_response.get('items', [])
         next_page_token = search_response.get('nextPageToken')
-        logger.info(f"Found {len(items)} recent videos")
+        logger.info("Found %d recent videos", len(items))
         return items, next_page_token
     except HttpError as e:
-        logger.error(f'An HTTP error occurred while searching videos: {e}')
+        logger.error('An HTTP error occurred while searching videos: %s', e)
         return [], None
 
 def parse_date(date_str: str) -> datetime:
-    """Parse date string from YouTube API, handling microseconds."""
+    """Parse date string from YouTube API (YYYY-MM-DDTHH:MM:SS[.ffffff]Z), ignoring microseconds."""
     try:
-        # Remove microseconds if present
-        if '.' in date_str:
-            date_str = date_str.split('.')[0] + 'Z'
-        return datetime.strptime(date_str, '%Y-%m-%dT%H:%M:%SZ')
+        # The API always uses a fixed-width ISO 8601 layout, so slicing avoids strptime
+        if len(date_str) < 20 or date_str[4] != '-' or date_str[10] != 'T':
+            raise ValueError('unexpected date format')
+        return datetime(
+            int(date_str[0:4]), int(date_str[5:7]), int(date_str[8:10]),
+            int(date_str[11:13]), int(date_str[14:16]), int(date_str[17:19])
+        )
     except ValueError as e:
-        logger.error(f"Error parsing date {date_str}: {e}")
+        logger.error("Error parsing date %s: %s", date_str, e)
         return None
 
-def get_channel_info(youtube, channel_id: str) -> Dict:
-    """Get detailed information about a channel."""
-    try:
-        logger.info(f"Fetching information for channel: {channel_id}")
-        channel_response = youtube.channels().list(
-            part='snippet,statistics',
-            id=channel_id
-        ).execute()
+def get_channels_info(youtube, channel_ids: List[str]) -> Dict[str, Dict]:
+    """
+    Get detailed information about up to 50 channels in a single request.
+    Only channels created within the last 6 months are returned. Channels found
+    in the on-disk cache are not requested again.
+    Returns a dict of channel info keyed by channel ID, or None if the request failed.
+    """
+    channels_info = {}
+    uncached_ids = []
+    for channel_id in channel_ids:
+        channel_info = channel_cache.get(channel_id)
+        if channel_info is None:
+            uncached_ids.append(channel_id)
+        else:
+            channels_info[channel_id] = channel_info
 
-        if not channel_response.get('items'):
-            logger.warning(f"No channel information found for ID: {channel_id}")
-            return None
+    if not uncached_ids:
+        logger.info("Loaded %d channels from cache", len(channel_ids))
+        return channels_info
 
-        channel = channel_response['items'][0]
-        published_at = channel['snippet']['publishedAt']
-        channel_created = parse_date(published_at)
-        
-        if not channel_created:
-            return None
-
-        channel_info = {
-            'channel_id': channel_id,
-            'title': channel['snippet']['title'],
-            'description': channel['snippet']['description'],
-            'published_at': published_at,
-            'subscriber_count': int(channel['statistics']['subscriberCount']),
-            'url': f'https://www.youtube.com/channel/{channel_id}'
-        }
-        
-        logger.info(f"Channel '{channel_info['title']}' created at: {published_at}")
-        return channel_info
+    try:
+        logger.info("Fetching information for %d channels (%d cached)", len(uncached_ids), len(channels_info))
+        channel_response = execute_request(youtube.channels().list(
+            part='snippet,statistics',
+            id=','.join(uncached_ids),
+            fields='items(id,snippet(title,description,publishedAt),statistics/subscriberCount)'
+        ), CHANNELS_QUOTA_COST, http=get_thread_http())
     except HttpError as e:
-        logger.error(f'An HTTP error occurred while fetching channel info: {e}')
-        return None
-    except KeyError as e:
-        logger.error(f'Missing key in channel response: {e}')
+        logger.error('An HTTP error occurred while fetching channel info: %s', e)
         return None
 
-def append_to_excel(channel_info: Dict):
-    """Append a single channel to the Excel file."""
+    for channel in channel_response.get('items', []):
+        channel_id = channel.get('id')
+        try:
+            published_at = channel['snippet']['publishedAt']
+            channel_created = parse_date(published_at)
+
+            # Check if channel was created within the last 6 months
+            if not channel_created or not is_recent_channel(channel_created):
+                logger.debug("Channel %s was created too long ago", channel_id)
+                continue
+
+            channel_info = {
+                'channel_id': channel_id,
+                'title': channel['snippet']['title'],
+                'description': channel['snippet']['description'],
+                'published_at': published_at,
+                'subscriber_count': int(channel['statistics']['subscriberCount']),
+                'url': f'https://www.youtube.com/channel/{channel_id}'
+            }
+        except KeyError as e:
+            logger.error('Missing key in channel response for %s: %s', channel_id, e)
+            continue
+
+        logger.debug("Channel '%s' created at: %s", channel_info['title'], published_at)
+        channel_cache.set(channel_id, channel_info, expire=CACHE_TTL_SECONDS)
+        channels_info[channel_id] = channel_info
+
+    return channels_info
+
+def chunked(items: Iterable[str], size: int = MAX_IDS_PER_REQUEST) -> Iterator[List[str]]:
+    """Yield successive lists of at most `size` items."""
+    iterator = iter(items)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+def write_workbook(df: pd.DataFrame):
+    """Stream rows into a write-only openpyxl workbook with clickable channel links."""
+    workbook = Workbook(write_only=True)
+    worksheet = workbook.create_sheet('New Channels')
+    url_index = df.columns.get_loc('url')
+    
+    # Widen the URL column
+    worksheet.column_dimensions[get_column_letter(url_index + 1)].width = 50
+    
+    worksheet.append(list(df.columns))
+    for row in df.itertuples(index=False, name=None):
+        row = list(row)
+        url = row[url_index]
+        if isinstance(url, str) and url:
+            # Turn the URL into a hyperlink
+            link_cell = WriteOnlyCell(worksheet, value=url)
+            link_cell.hyperlink = url
+            link_cell.style = 'Hyperlink'
+            row[url_index] = link_cell
+        worksheet.append(row)
+    
+    workbook.save(EXCEL_FILE)
+
+def flush_to_excel(results: List[Dict]):
+    """Write all collected channels to the output file in a single pass."""
+    if not results:
+        logger.info("No new channels to write to output file")
+        return
+
     try:
-        logger.info(f"Attempting to write channel '{channel_info['title']}' to Excel file")
+        logger.info(f"Attempting to write {len(results)} channels to output file")
         
-        # Create DataFrame for the new channel
-        new_df = pd.DataFrame([channel_info])
+        # Create DataFrame for the new channels
+        new_df = pd.DataFrame(results)
         
-        # Try to read existing Excel file
+        # Try to read existing output file
         try:
-            if os.path.exists(EXCEL_FILE):
-                logger.info(f"Reading existing Excel file: {EXCEL_FILE}")
-                existing_df = pd.read_excel(EXCEL_FILE)
+            if os.path.exists(OUTPUT_FILE):
+                logger.info(f"Reading existing output file: {OUTPUT_FILE}")
+                if OUTPUT_FORMAT == 'csv':
+                    existing_df = pd.read_csv(OUTPUT_FILE)
+                else:
+                    existing_df = pd.read_excel(OUTPUT_FILE)
                 # Combine existing data with new data
                 combined_df = pd.concat([existing_df, new_df], ignore_index=True)
             else:
-                logger.info("No existing Excel file found, creating new one")
+                logger.info("No existing output file found, creating new one")
                 combined_df = new_df
         except Exception as e:
-            logger.error(f"Error reading existing Excel file: {e}")
+            logger.error(f"Error reading existing output file: {e}")
             combined_df = new_df
         
-        # Sort by subscriber count
-        combined_df = combined_df.sort_values('subscriber_count', ascending=False)
+        # Keep the latest row for channels that were already in the output file
+        combined_df = combined_df.drop_duplicates('channel_id', keep='last')
         
-        # Write to Excel with formatting
-        logger.info(f"Writing to Excel file: {EXCEL_FILE}")
-        with pd.ExcelWriter(EXCEL_FILE, engine='xlsxwriter') as writer:
-            combined_df.to_excel(writer, index=False, sheet_name='New Channels')
-            
-            # Get workbook and worksheet objects
-            workbook = writer.book
-            worksheet = writer.sheets['New Channels']
-            
-            # Add hyperlink format
-            link_format = workbook.add_format({
-                'color': 'blue',
-                'underline': True
-            })
-            
-            # Apply hyperlink format to URL column
-            worksheet.set_column('F:F', 50, link_format)
+        # Sort by subscriber count as integers so pandas never falls back to object comparisons.
+        # Blank or non-numeric cells (e.g. from a hand-edited file) become 0 instead of failing
+        combined_df['subscriber_count'] = (
+            pd.to_numeric(combined_df['subscriber_count'], errors='coerce')
+            .fillna(0)
+            .astype('int64', copy=False)
+        )
+        combined_df = combined_df.sort_values('subscriber_count', ascending=False, kind='stable', ignore_index=True)
+        
+        logger.info(f"Writing to output file: {OUTPUT_FILE}")
+        if OUTPUT_FORMAT == 'csv':
+            combined_df.to_csv(OUTPUT_FILE, index=False)
+        else:
+            write_workbook(combined_df)
         
         # Verify file was created
-        if os.path.exists(EXCEL_FILE):
-            file_size = os.path.getsize(EXCEL_FILE)
-            logger.info(f"Successfully wrote to Excel file. File size: {file_size} bytes")
+        if os.path.exists(OUTPUT_FILE):
+            file_size = os.path.getsize(OUTPUT_FILE)
+            logger.info(f"Successfully wrote to output file. File size: {file_size} bytes")
         else:
-            logger.error("Excel file was not created successfully")
+            logger.error("Output file was not created successfully")
             
     except Exception as e:
-        logger.error(f"Error updating Excel file: {e}")
+        logger.error(f"Error updating output file: {e}")
         logger.error(f"Current working directory: {os.getcwd()}")
-        logger.error(f"Attempted to write to: {EXCEL_FILE}")
+        logger.error(f"Attempted to write to: {OUTPUT_FILE}")
+
+def load_processed_channels_json() -> set:
+    """Load the IDs of channels rejected on previous runs from the JSON file."""
+    try:
+        if os.path.exists(PROCESSED_CHANNELS_FILE):
+            with open(PROCESSED_CHANNELS_FILE, 'r', encoding='utf-8') as f:
+                processed_channels = set(json.load(f))
+            logger.info(f"Loaded {len(processed_channels)} previously processed channels")
+            return processed_channels
+    except (OSError, ValueError) as e:
+        logger.error(f"Error reading processed channels file: {e}")
+    return set()
+
+def load_processed_channels():
+    """
+    Load the IDs of channels rejected on previous runs (too old or too few subscribers).
+    Returns a set, or a ScalableBloomFilter when USE_BLOOM_FILTER is enabled.
+    """
+    if USE_BLOOM_FILTER:
+        if ScalableBloomFilter is None:
+            logger.warning("pybloom_live is not installed, falling back to a set of processed channels")
+        else:
+            try:
+                if os.path.exists(PROCESSED_CHANNELS_BLOOM_FILE):
+                    with open(PROCESSED_CHANNELS_BLOOM_FILE, 'rb') as f:
+                        processed_channels = ScalableBloomFilter.fromfile(f)
+                    logger.info(f"Loaded about {len(processed_channels)} previously processed channels")
+                    return processed_channels
+            except Exception as e:
+                # A truncated or corrupt filter can fail in many ways (struct.error, EOFError, ...)
+                logger.error(f"Error reading processed channels file: {e}")
+
+            # Carry over the history kept by the set backend
+            processed_channels = ScalableBloomFilter(initial_capacity=BLOOM_INITIAL_CAPACITY, error_rate=BLOOM_ERROR_RATE)
+            for channel_id in load_processed_channels_json():
+                processed_channels.add(channel_id)
+            return processed_channels
+
+    return load_processed_channels_json()
+
+def save_processed_channels(processed_channels):
+    """Save the IDs of rejected channels so later runs can skip them."""
+    try:
+        if isinstance(processed_channels, set):
+            with open(PROCESSED_CHANNELS_FILE, 'w', encoding='utf-8') as f:
+                json.dump(sorted(processed_channels), f)
+            saved_file = PROCESSED_CHANNELS_FILE
+        else:
+            with open(PROCESSED_CHANNELS_BLOOM_FILE, 'wb') as f:
+                processed_channels.tofile(f)
+            saved_file = PROCESSED_CHANNELS_BLOOM_FILE
+        logger.info(f"Saved {len(processed_channels)} processed channels to: {saved_file}")
+    except OSError as e:
+        logger.error(f"Error writing processed channels file: {e}")
 
 def is_recent_channel(channel_created: datetime) -> bool:
     """Check if a channel was created within the last 6 months."""
-    six_months_ago = datetime.now() - timedelta(days=180)
-    return channel_created >= six_months_ago
+    return channel_created >= RECENT_CHANNEL_CUTOFF
 
 def main():
     logger.info("Starting YouTube Growth Tracker script")
     logger.info(f"Current working directory: {os.getcwd()}")
-    logger.info(f"Excel file will be saved to: {EXCEL_FILE}")
+    logger.info(f"Output file will be saved to: {OUTPUT_FILE}")
     
-    # Verify Excel file path
+    # Verify output file path
     verify_excel_file()
+    prune_http_cache()
     
     youtube = get_youtube_service()
-    processed_channels = set()
-    next_page_token = None
+    processed_channels = load_processed_channels()  # Channels rejected on this or previous runs
+    queued_channels = set()  # Channels looked up during this run
+    results = []
+    search_buckets = build_search_buckets()
     pages_processed = 0
     max_pages = 100  # Increased max pages to find more channels
     channels_found = 0
-    retry_count = 0
-    max_retries = 3
+    channels_checked = 0  # Channel IDs whose lookups have completed
 
-    while channels_found < MIN_CHANNELS_REQUIRED and pages_processed < max_pages:
-        pages_processed += 1
-        logger.info(f"Processing page {pages_processed}")
-        
-        # Get recent videos with pagination
-        videos, next_page_token = search_recent_videos(youtube, page_token=next_page_token)
-        
-        if not videos:
-            if retry_count < max_retries:
-                retry_count += 1
-                logger.warning(f"No videos found, retrying... (Attempt {retry_count}/{max_retries})")
-                time.sleep(5)  # Wait before retrying
-                continue
-            else:
-                logger.warning("No more videos found after retries")
-                break
-        
-        retry_count = 0  # Reset retry count on successful video fetch
-        
-        # Process each video to get channel information
-        for video in videos:
-            channel_id = video['snippet']['channelId']
+    try:
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            pending = set()
+            batches = {}
+
+            def collect(futures):
+                """Move channels from finished batches into the results."""
+                nonlocal channels_found, channels_checked
+                for future in futures:
+                    bucket, batch = batches.pop(future)
+                    channels_info = future.result()
+                    if channels_info is None:
+                        # Leave failed lookups unrecorded so a later run retries them
+                        continue
+                    channels_checked += len(batch)
+                    # Only rejected channels are remembered across runs; accepted ones are
+                    # looked up again (through the 24h cache) so their stats stay current
+                    for channel_id in batch:
+                        if channel_id not in channels_info:
+                            processed_channels.add(channel_id)
+                    for channel_info in channels_info.values():
+                        if channel_info['subscriber_count'] < MIN_SUBSCRIBERS:
+                            logger.debug("Channel '%s' has too few subscribers", channel_info['title'])
+                            processed_channels.add(channel_info['channel_id'])
+                            continue
+                        bucket['hits'] += 1
+                        logger.info("Adding channel '%s' to results", channel_info['title'])
+                        results.append(channel_info)
+                        channels_found += 1
+                        logger.info("Found %d/%d required channels", channels_found, MIN_CHANNELS_REQUIRED)
+
+            while channels_found < MIN_CHANNELS_REQUIRED and pages_processed < max_pages:
+                # Don't pay for another search if the batches in flight are expected to reach
+                # the target, estimating their yield from the acceptance rate seen so far
+                if pending and channels_checked:
+                    in_flight = sum(len(batches[future][1]) for future in pending)
+                    expected_hits = in_flight * channels_found / channels_checked
+                else:
+                    expected_hits = 0
+                if pending and channels_found + expected_hits >= MIN_CHANNELS_REQUIRED:
+                    done, pending = wait(pending)
+                    collect(done)
+                    continue
+
+                active_buckets = [bucket for bucket in search_buckets if not bucket['exhausted']]
+                if not active_buckets:
+                    logger.info("No more pages to process")
+                    break
+
+                # Take turns between the search windows
+                bucket = active_buckets[pages_processed % len(active_buckets)]
+                pages_processed += 1
+                logger.info("Processing page %d", pages_processed)
             
-            # Skip if we've already processed this channel
-            if channel_id in processed_channels:
-                logger.debug(f"Skipping already processed channel: {channel_id}")
-                continue
-                
-            processed_channels.add(channel_id)
+                # Get recent videos with pagination
+                videos, bucket['next_page_token'] = search_recent_videos(
+                    youtube,
+                    bucket['published_after'],
+                    bucket['published_before'],
+                    page_token=bucket['next_page_token']
+                )
             
-            # Get channel information
-            channel_info = get_channel_info(youtube, channel_id)
+                if not videos:
+                    logger.warning("No more videos found in this search window")
+                    bucket['exhausted'] = True
+                    continue
             
-            if channel_info:
-                # Check if channel was created within the last 6 months
-                channel_created = parse_date(channel_info['published_at'])
-                
-                if channel_created and is_recent_channel(channel_created):
-                    logger.info(f"Adding channel '{channel_info['title']}' to results")
-                    append_to_excel(channel_info)
-                    channels_found += 1
-                    logger.info(f"Found {channels_found}/{MIN_CHANNELS_REQUIRED} required channels")
-                else:
-                    logger.info(f"Channel '{channel_info['title']}' was created too long ago")
+                # Collect unseen channel IDs from this page
+                new_channel_ids = {
+                    video['snippet']['channelId'] for video in videos
+                    if video['snippet']['channelId'] not in processed_channels
+                } - queued_channels
+                queued_channels.update(new_channel_ids)
+
+                # Only pages with unseen channels count towards the window's hit rate, so
+                # pages already covered by an earlier run don't get the window skipped
+                if new_channel_ids:
+                    bucket['pages'] += 1
+
+                # Fetch channel information in batches while the next page is searched
+                for batch in chunked(sorted(new_channel_ids)):
+                    future = executor.submit(get_channels_info, youtube, batch)
+                    batches[future] = (bucket, batch)
+                    pending.add(future)
+
+                # Pick up batches that have already finished without blocking
+                done, pending = wait(pending, timeout=0)
+                collect(done)
             
-            # Sleep to avoid hitting API quota limits
-            time.sleep(0.5)
-        
-        if not next_page_token:
-            if retry_count < max_retries:
-                retry_count += 1
-                logger.warning(f"No next page token, retrying... (Attempt {retry_count}/{max_retries})")
-                time.sleep(5)  # Wait before retrying
-                continue
-            else:
-                logger.info("No more pages to process after retries")
-                break
+                if not bucket['next_page_token']:
+                    logger.info("No more pages to process in this search window")
+                    bucket['exhausted'] = True
+                elif bucket['pages'] >= MIN_PAGES_PER_BUCKET and bucket['hits'] < bucket['pages'] * MIN_HITS_PER_PAGE:
+                    # Count this window's batches still in flight before judging its hit rate
+                    bucket_pending = {future for future in pending if batches[future][0] is bucket}
+                    if bucket_pending:
+                        done, _ = wait(bucket_pending)
+                        pending -= done
+                        collect(done)
+
+                    if bucket['hits'] < bucket['pages'] * MIN_HITS_PER_PAGE:
+                        # Stop spending search quota on windows that rarely yield new channels
+                        logger.info("Skipping search window after %d new channels in %d pages", bucket['hits'], bucket['pages'])
+                        bucket['exhausted'] = True
+
+            # Wait for the batches still in flight
+            done, pending = wait(pending)
+            collect(done)
+    finally:
+        # Persist whatever was collected, even if the search loop failed
+        flush_to_excel(results)
+        save_processed_channels(processed_channels)
 
     logger.info(f"Script completed. Found {channels_found} channels matching criteria.")
-    logger.info(f"Excel file location: {EXCEL_FILE}")
+    if pages_processed:
+        logger.info(f"Acceptance rate: {channels_found / pages_processed:.2f} channels per search")
+    logger.info(f"Output file location: {OUTPUT_FILE}")
 
 if __name__ == '__main__':
     main() 
\ No newline at end of file